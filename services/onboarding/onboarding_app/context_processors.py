@@ -16,11 +16,13 @@ def theme_context(request):
         primary_color = config.primary_color
         secondary_color = config.secondary_color
         organization_name = config.organization_name
+        logo_urls = config.get_logo_urls()
     except OnboardingConfig.DoesNotExist:
         # Fall back to settings
         primary_color = settings.PRIMARY_COLOR
         secondary_color = settings.SECONDARY_COLOR
         organization_name = settings.APP_NAME
+        logo_urls = {}
 
     # Calculate lighter and darker shades for accessibility
     def hex_to_rgb(hex_color):
@@ -48,4 +50,5 @@ def theme_context(request):
         'SECONDARY_COLOR': secondary_color,
         'SECONDARY_COLOR_LIGHT': lighten_color(secondary_color),
         'SECONDARY_COLOR_DARK': darken_color(secondary_color),
+        'LOGO_URLS': logo_urls,
     }
@@ -0,0 +1,207 @@
+"""
+Logo processing for The Logbook Onboarding Module
+
+Uploaded logos are resized into every variant the pages need exactly once,
+in a process pool so request threads never do image work. Variants are
+saved under content-hashed names, so their URLs can be cached forever.
+"""
+import hashlib
+import io
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+
+ALLOWED_LOGO_FORMATS = {'PNG', 'JPEG', 'WEBP', 'GIF'}
+
+# name: (bounding box, format, pad to square)
+LOGO_VARIANTS = {
+    'favicon': ((32, 32), 'PNG', True),
+    'favicon_ico': ((48, 48), 'ICO', True),
+    'apple_touch_icon': ((180, 180), 'PNG', True),
+    'header': ((320, 64), 'PNG', False),
+    'header_2x': ((640, 128), 'PNG', False),
+    'header_webp': ((320, 64), 'WEBP', False),
+    'header_2x_webp': ((640, 128), 'WEBP', False),
+    'header_avif': ((320, 64), 'AVIF', False),
+    'header_2x_avif': ((640, 128), 'AVIF', False),
+}
+
+FORMAT_EXTENSIONS = {'PNG': 'png', 'ICO': 'ico', 'WEBP': 'webp', 'AVIF': 'avif'}
+
+# Smallest box that holds every variant; the source is downscaled to this once
+RENDER_BOX = (
+    max(size[0] for size, _, _ in LOGO_VARIANTS.values()),
+    max(size[1] for size, _, _ in LOGO_VARIANTS.values()),
+)
+
+logger = logging.getLogger(__name__)
+
+_pool_lock = threading.Lock()
+_process_pool = None
+_io_pool = None
+
+
+def check_logo_size(size):
+    """Raise ValueError if an upload of this many bytes is too large"""
+    if size > settings.LOGO_MAX_UPLOAD_BYTES:
+        raise ValueError(
+            f"Logo must be smaller than {settings.LOGO_MAX_UPLOAD_BYTES // (1024 * 1024)} MB."
+        )
+
+
+def validate_logo(data):
+    """
+    Cheaply check that uploaded bytes are a supported image.
+    Raises ValueError with a user-facing message otherwise.
+    Dimensions come from the header, so oversized images are rejected
+    before anything is decoded.
+    """
+    check_logo_size(len(data))
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image_format = image.format
+            width, height = image.size
+            image.verify()
+    except Exception:
+        raise ValueError("Logo must be a PNG, JPEG, WebP or GIF image.")
+    if image_format not in ALLOWED_LOGO_FORMATS:
+        raise ValueError("Logo must be a PNG, JPEG, WebP or GIF image.")
+    if width * height > settings.LOGO_MAX_PIXELS:
+        raise ValueError(
+            f"Logo must be at most {settings.LOGO_MAX_PIXELS / 1_000_000:.1f} megapixels; "
+            f"this one is {width} x {height}."
+        )
+
+
+def _render_variant(source, size, image_format, square):
+    image = source.copy()  # source is already at most RENDER_BOX
+    image.thumbnail(size, Image.LANCZOS)
+    if square:
+        canvas = Image.new('RGBA', size, (0, 0, 0, 0))
+        canvas.paste(image, ((size[0] - image.width) // 2, (size[1] - image.height) // 2))
+        image = canvas
+
+    output = io.BytesIO()
+    if image_format == 'ICO':
+        image.save(output, format='ICO', sizes=[(16, 16), (32, 32), (48, 48)])
+    elif image_format in ('WEBP', 'AVIF'):
+        image.save(output, format=image_format, quality=85)
+    else:
+        image.save(output, format=image_format, optimize=True)
+    return output.getvalue()
+
+
+def render_logo_variants(data):
+    """
+    Render every supported variant of a logo.
+    Runs in a worker process; takes and returns plain bytes so nothing
+    Django-specific crosses the process boundary.
+    Returns {variant name: (content, extension)}.
+    """
+    Image.init()
+    with Image.open(io.BytesIO(data)) as uploaded:
+        # JPEG can decode at a reduced scale, skipping most of the work
+        uploaded.draft('RGB', RENDER_BOX)
+        source = ImageOps.exif_transpose(uploaded).convert('RGBA')
+    # Downscale once; every variant is derived from this small copy
+    source.thumbnail(RENDER_BOX, Image.LANCZOS)
+
+    rendered = {}
+    for name, (size, image_format, square) in LOGO_VARIANTS.items():
+        # Pillow wheels include AVIF from 11.3; skip it on builds without libavif
+        if image_format not in Image.SAVE:
+            continue
+        content = _render_variant(source, size, image_format, square)
+        rendered[name] = (content, FORMAT_EXTENSIONS[image_format])
+    return rendered
+
+
+def store_logo_variants(config_pk, rendered):
+    """
+    Save rendered variants under content-hashed names and record their
+    paths on the config. Files that already exist are not rewritten.
+    """
+    from .models import OnboardingConfig
+
+    variants = {}
+    for name, (content, extension) in rendered.items():
+        digest = hashlib.sha256(content).hexdigest()[:16]
+        path = f"{settings.LOGO_UPLOAD_DIR}/{name}.{digest}.{extension}"
+        if not default_storage.exists(path):
+            path = default_storage.save(path, ContentFile(content))
+        variants[name] = path
+
+    # updated_at is bumped explicitly since update() skips auto_now
+    OnboardingConfig.objects.filter(pk=config_pk).update(
+        logo_variants=variants, updated_at=timezone.now()
+    )
+    return variants
+
+
+def _get_process_pool():
+    global _process_pool
+    with _pool_lock:
+        if _process_pool is None:
+            # spawn avoids forking a multi-threaded server process
+            _process_pool = ProcessPoolExecutor(
+                max_workers=settings.LOGO_PROCESS_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+    return _process_pool
+
+
+def _discard_process_pool(pool):
+    """Forget a broken pool so the next upload starts a fresh one"""
+    global _process_pool
+    with _pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _render_in_pool(data):
+    pool = _get_process_pool()
+    try:
+        return pool.submit(render_logo_variants, data).result()
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); the pool can't be reused
+        _discard_process_pool(pool)
+        raise
+
+
+def _get_io_pool():
+    global _io_pool
+    with _pool_lock:
+        if _io_pool is None:
+            _io_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='logo-variants')
+    return _io_pool
+
+
+def _generate_and_store(config_pk, data):
+    try:
+        rendered = _render_in_pool(data)
+        return store_logo_variants(config_pk, rendered)
+    except Exception:
+        logger.exception("Generating logo variants failed for config %s", config_pk)
+        raise
+    finally:
+        # This thread has its own database connection; don't leak it
+        connection.close()
+
+
+def schedule_logo_variants(config_pk, data):
+    """
+    Generate and store logo variants in the background.
+    Returns a Future resolving to {variant name: storage path}.
+    """
+    return _get_io_pool().submit(_generate_and_store, config_pk, data)
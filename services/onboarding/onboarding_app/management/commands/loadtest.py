@@ -0,0 +1,265 @@
+"""
+Load test for The Logbook Onboarding Module
+
+Simulates concurrent clients walking the onboarding wizard against a running
+server and reports throughput, latency percentiles, error rates and database
+work per request. Start the server with QUERY_METRICS_HEADERS=True to get
+query and connection counts.
+
+The app keeps a single in-progress onboarding config, so concurrent clients
+all edit that one shared wizard session rather than setting up separate
+departments. Once one client completes it, the others' later posts fail and
+are counted as errors. Use the numbers to measure request handling under
+load, not as a count of independent setups.
+
+    python manage.py loadtest --base-url http://127.0.0.1:8000 --clients 20
+"""
+import http.cookiejar
+import json
+import math
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+CSRF_TOKEN_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+# Flash message shown on the welcome page after a successful step 8
+COMPLETED_MESSAGE = 'Onboarding completed successfully!'
+
+# Form data posted for each wizard step
+STEP_DATA = {
+    1: {'organization_name': 'Load Test Fire Department', 'primary_color': '#DC2626', 'secondary_color': '#1F2937'},
+    2: {'email_host': '', 'email_port': '587', 'email_host_user': '', 'email_from_address': ''},
+    3: {'session_timeout': '60', 'password_min_length': '12', 'allowed_domains': ''},
+    4: {'storage_backend': 'local'},
+    5: {},
+    6: {},
+    7: {},
+    8: {'confirm_setup': 'on'},
+}
+
+
+class _NoRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Surface redirects as responses so each request is timed separately"""
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class WizardClient:
+    """One simulated user with its own session and CSRF cookies"""
+
+    def __init__(self, base_url, timeout, record):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.record = record
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+            _NoRedirectHandler,
+        )
+
+    def request(self, name, path, data=None, expect=None, contains=None):
+        """
+        Send one request and record it. A request succeeds if it returns 200
+        (with contains in the body, if given), or, when expect is given,
+        redirects to that path. Returns (succeeded, body).
+        """
+        url = self.base_url + path
+        headers = {}
+        body = None
+        if data is not None:
+            body = urllib.parse.urlencode(data).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['Referer'] = url
+        request = urllib.request.Request(url, data=body, headers=headers)
+
+        started = time.perf_counter()
+        status, text, response_headers = 0, '', {}
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                status, text, response_headers = response.status, response.read().decode(), response.headers
+        except urllib.error.HTTPError as e:
+            status, response_headers = e.code, e.headers
+        except (urllib.error.URLError, OSError):
+            pass
+        elapsed = time.perf_counter() - started
+
+        if expect is None:
+            ok = status == 200 and (contains is None or contains in text)
+        else:
+            location = urllib.parse.urlsplit(response_headers.get('Location', '')).path
+            ok = status == 302 and location == expect
+        self.record(name, elapsed, ok, response_headers)
+        return ok, text
+
+    def walk(self):
+        """
+        Walk the welcome page and all 8 steps; return True if every step succeeded.
+        A failed post also redirects, so each redirect target is checked, and
+        completion is confirmed by the success message on the welcome page.
+        """
+        ok, _ = self.request('GET welcome', '/')
+        if not ok:
+            return False
+
+        for step, data in STEP_DATA.items():
+            ok, text = self.request(f'GET step {step}', f'/step/{step}/')
+            match = CSRF_TOKEN_RE.search(text)
+            if not ok or not match:
+                return False
+
+            # Steps 1-7 go to the next step; step 8 and every failure go to the welcome page
+            expect = f'/step/{step + 1}/' if step < len(STEP_DATA) else '/'
+            ok, _ = self.request(f'POST step {step}', f'/step/{step}/',
+                                 dict(data, csrfmiddlewaretoken=match.group(1)), expect=expect)
+            if not ok:
+                return False
+
+        # Missing when another client completed the shared wizard first
+        ok, _ = self.request('GET completed', '/', contains=COMPLETED_MESSAGE)
+        return ok
+
+
+class Command(BaseCommand):
+    help = (
+        'Run concurrent clients through the onboarding wizard against a running server. '
+        'All clients share the single in-progress onboarding session, so this measures '
+        'request handling under load, not N independent department setups.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000',
+                            help='Server to test (default: http://127.0.0.1:8000)')
+        parser.add_argument('--clients', type=int, default=10,
+                            help='Number of concurrent clients (default: 10)')
+        parser.add_argument('--iterations', type=int, default=1,
+                            help='Wizard walks per client (default: 1)')
+        parser.add_argument('--timeout', type=float, default=30,
+                            help='Per-request timeout in seconds (default: 30)')
+        parser.add_argument('--label', default='',
+                            help='Name for this run, e.g. "sync-3-workers", to compare configurations')
+        parser.add_argument('--json', action='store_true',
+                            help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['iterations'] < 1:
+            raise CommandError('--clients and --iterations must be at least 1.')
+
+        try:
+            urllib.request.urlopen(options['base_url'], timeout=options['timeout']).close()
+        except urllib.error.HTTPError:
+            pass
+        except (urllib.error.URLError, OSError) as e:
+            raise CommandError(f"Cannot reach {options['base_url']}: {e}")
+
+        lock = threading.Lock()
+        samples = []
+
+        def record(name, elapsed, ok, headers):
+            with lock:
+                samples.append((name, elapsed, ok, headers.get('X-DB-Queries'), headers.get('X-DB-Connections')))
+
+        def run_client():
+            client = WizardClient(options['base_url'], options['timeout'], record)
+            return sum(client.walk() for _ in range(options['iterations']))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['clients']) as executor:
+            completed = sum(executor.map(lambda _: run_client(), range(options['clients'])))
+        duration = time.perf_counter() - started
+
+        report = self._build_report(samples, duration, completed, options)
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._print_report(report)
+
+    def _build_report(self, samples, duration, completed, options):
+        by_name = defaultdict(list)
+        for sample in samples:
+            by_name[sample[0]].append(sample)
+
+        def summarize(rows):
+            latencies = sorted(row[1] * 1000 for row in rows)
+            errors = sum(1 for row in rows if not row[2])
+            queries = [int(row[3]) for row in rows if row[3] is not None]
+            connections = [int(row[4]) for row in rows if row[4] is not None]
+            return {
+                'requests': len(rows),
+                'errors': errors,
+                'error_rate': errors / len(rows) if rows else 0.0,
+                'p50_ms': round(percentile(latencies, 50), 1),
+                'p90_ms': round(percentile(latencies, 90), 1),
+                'p99_ms': round(percentile(latencies, 99), 1),
+                'max_ms': round(latencies[-1], 1) if latencies else 0.0,
+                'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+                'connections_per_request': round(sum(connections) / len(connections), 2) if connections else None,
+            }
+
+        return {
+            'label': options['label'],
+            'base_url': options['base_url'],
+            'clients': options['clients'],
+            'iterations': options['iterations'],
+            'duration_s': round(duration, 2),
+            'throughput_rps': round(len(samples) / duration, 1) if duration else 0.0,
+            'wizards_completed': completed,
+            'wizards_attempted': options['clients'] * options['iterations'],
+            'overall': summarize(samples),
+            'endpoints': {name: summarize(rows) for name, rows in by_name.items()},
+        }
+
+    def _print_report(self, report):
+        overall = report['overall']
+        title = f"Load test: {report['label']}" if report['label'] else 'Load test'
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        self.stdout.write(
+            f"  {report['clients']} clients x {report['iterations']} walks against {report['base_url']} "
+            f"in {report['duration_s']}s"
+        )
+        self.stdout.write(
+            f"  Requests: {overall['requests']}  Throughput: {report['throughput_rps']} req/s  "
+            f"Errors: {overall['errors']} ({overall['error_rate']:.1%})  "
+            f"Wizards completed: {report['wizards_completed']}/{report['wizards_attempted']}"
+        )
+        self.stdout.write(
+            f"  Latency ms  p50 {overall['p50_ms']}  p90 {overall['p90_ms']}  "
+            f"p99 {overall['p99_ms']}  max {overall['max_ms']}"
+        )
+        if report['clients'] > 1:
+            self.stdout.write(
+                '  Note: clients share the single in-progress wizard session; '
+                'failures after another client completes it are expected'
+            )
+        if overall['queries_per_request'] is None:
+            self.stdout.write('  DB metrics unavailable; start the server with QUERY_METRICS_HEADERS=True')
+        else:
+            self.stdout.write(
+                f"  DB per request  queries {overall['queries_per_request']}  "
+                f"new connections {overall['connections_per_request']}"
+            )
+
+        self.stdout.write('')
+        self.stdout.write(f"  {'Endpoint':<14}{'Reqs':>6}{'Err':>5}{'p50':>9}{'p90':>9}{'p99':>9}{'Queries':>9}{'Conns':>7}")
+        for name, stats in report['endpoints'].items():
+            queries = '-' if stats['queries_per_request'] is None else stats['queries_per_request']
+            conns = '-' if stats['connections_per_request'] is None else stats['connections_per_request']
+            self.stdout.write(
+                f"  {name:<14}{stats['requests']:>6}{stats['errors']:>5}{stats['p50_ms']:>9}"
+                f"{stats['p90_ms']:>9}{stats['p99_ms']:>9}{queries:>9}{conns:>7}"
+            )
@@ -0,0 +1,44 @@
+"""
+Middleware for The Logbook Onboarding Module
+"""
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+class QueryMetricsMiddleware:
+    """
+    Reports database work per request in response headers, for load tests.
+    X-DB-Queries is the number of queries run and X-DB-Connections the number
+    of new database connections opened while handling the request.
+    Only enabled when QUERY_METRICS_HEADERS is set.
+    """
+    def __init__(self, get_response):
+        if not settings.QUERY_METRICS_HEADERS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counts = {'queries': 0, 'connections': 0}
+        # The wrapper is per thread, so this ignores other requests' work
+        db = connections['default']
+
+        def count_query(execute, sql, params, many, context):
+            counts['queries'] += 1
+            return execute(sql, params, many, context)
+
+        def count_connection(sender, connection, **kwargs):
+            if connection is db:
+                counts['connections'] += 1
+
+        connection_created.connect(count_connection)
+        try:
+            with db.execute_wrapper(count_query):
+                response = self.get_response(request)
+        finally:
+            connection_created.disconnect(count_connection)
+
+        response['X-DB-Queries'] = str(counts['queries'])
+        response['X-DB-Connections'] = str(counts['connections'])
+        return response
@@ -0,0 +1,72 @@
+# Generated by Django 5.1.5 on 2026-10-19 05:56
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OnboardingConfig',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('organization_name', models.CharField(help_text='Fire Department Name', max_length=255)),
+                ('primary_color', models.CharField(default='#DC2626', help_text='Primary theme color (hex code)', max_length=7, validators=[django.core.validators.RegexValidator('^#[0-9A-Fa-f]{6}$', 'Enter a valid hex color code')])),
+                ('secondary_color', models.CharField(default='#1F2937', help_text='Secondary theme color (hex code)', max_length=7, validators=[django.core.validators.RegexValidator('^#[0-9A-Fa-f]{6}$', 'Enter a valid hex color code')])),
+                ('email_backend', models.CharField(default='django.core.mail.backends.smtp.EmailBackend', max_length=255)),
+                ('email_host', models.CharField(blank=True, max_length=255)),
+                ('email_port', models.IntegerField(default=587)),
+                ('email_use_tls', models.BooleanField(default=True)),
+                ('email_use_ssl', models.BooleanField(default=False)),
+                ('email_host_user', models.CharField(blank=True, max_length=255)),
+                ('email_host_password_encrypted', models.TextField(blank=True, help_text='Encrypted email password')),
+                ('email_from_address', models.EmailField(blank=True, max_length=254, validators=[django.core.validators.EmailValidator()])),
+                ('session_timeout_minutes', models.IntegerField(default=60, help_text='Session timeout in minutes')),
+                ('password_min_length', models.IntegerField(default=12, help_text='Minimum password length')),
+                ('require_2fa', models.BooleanField(default=False, help_text='Require two-factor authentication')),
+                ('allowed_domains', models.TextField(blank=True, help_text='Comma-separated list of allowed email domains')),
+                ('storage_backend', models.CharField(choices=[('local', 'Local Storage'), ('s3', 'AWS S3')], default='local', max_length=50)),
+                ('s3_bucket_name', models.CharField(blank=True, max_length=255)),
+                ('s3_access_key_encrypted', models.TextField(blank=True)),
+                ('s3_secret_key_encrypted', models.TextField(blank=True)),
+                ('s3_region', models.CharField(blank=True, default='us-east-1', max_length=50)),
+                ('integrations_configured', models.JSONField(blank=True, default=dict)),
+                ('is_completed', models.BooleanField(default=False)),
+                ('current_step', models.IntegerField(default=1, help_text='Current onboarding step (1-8)')),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Onboarding Configuration',
+                'verbose_name_plural': 'Onboarding Configurations',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OnboardingStep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('step_number', models.IntegerField()),
+                ('step_name', models.CharField(max_length=100)),
+                ('is_completed', models.BooleanField(default=False)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('data', models.JSONField(blank=True, default=dict, help_text='Step-specific data')),
+                ('config', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='steps', to='onboarding_app.onboardingconfig')),
+            ],
+            options={
+                'ordering': ['step_number'],
+                'unique_together': {('config', 'step_number')},
+            },
+        ),
+    ]
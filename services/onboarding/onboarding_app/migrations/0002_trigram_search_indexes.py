@@ -0,0 +1,25 @@
+# Generated by Django 5.1.5 on 2026-10-19 05:56
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('onboarding_app', '0001_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='onboardingconfig',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('organization_name'), name='gin_trgm_ops'), name='onboarding_org_name_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='onboardingconfig',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('email_host_user'), name='gin_trgm_ops'), name='onboarding_email_user_trgm'),
+        ),
+    ]
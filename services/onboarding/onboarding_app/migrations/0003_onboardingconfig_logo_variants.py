@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-19 05:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('onboarding_app', '0002_trigram_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='onboardingconfig',
+            name='logo_variants',
+            field=models.JSONField(blank=True, default=dict, help_text='Storage paths of generated logo variants, keyed by variant name'),
+        ),
+    ]
@@ -2,10 +2,13 @@
 Models for The Logbook Onboarding Module
 """
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.core.validators import EmailValidator, RegexValidator
 from cryptography.fernet import Fernet
 from django.conf import settings
+from django.core.files.storage import default_storage
 import base64
 
 
@@ -28,6 +31,11 @@ class OnboardingConfig(models.Model):
         validators=[RegexValidator(r'^#[0-9A-Fa-f]{6}$', 'Enter a valid hex color code')],
         help_text="Secondary theme color (hex code)"
     )
+    logo_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Storage paths of generated logo variants, keyed by variant name"
+    )
 
     # Email Configuration (Page 2)
     email_backend = models.CharField(max_length=255, default='django.core.mail.backends.smtp.EmailBackend')
@@ -71,10 +79,26 @@ class OnboardingConfig(models.Model):
         verbose_name = "Onboarding Configuration"
         verbose_name_plural = "Onboarding Configurations"
         ordering = ['-created_at']
+        # Trigram indexes on UPPER(column) match the SQL Django emits for
+        # icontains on PostgreSQL, so admin searches avoid sequential scans.
+        indexes = [
+            GinIndex(
+                OpClass(Upper('organization_name'), name='gin_trgm_ops'),
+                name='onboarding_org_name_trgm',
+            ),
+            GinIndex(
+                OpClass(Upper('email_host_user'), name='gin_trgm_ops'),
+                name='onboarding_email_user_trgm',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.organization_name} - Step {self.current_step}/8"
 
+    def get_logo_urls(self):
+        """Return public URLs of the generated logo variants"""
+        return {name: default_storage.url(path) for name, path in (self.logo_variants or {}).items()}
+
     @staticmethod
     def _get_encryption_key():
         """Get or generate encryption key for sensitive data"""
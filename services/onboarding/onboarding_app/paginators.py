@@ -0,0 +1,46 @@
+"""
+Paginators for The Logbook Onboarding Module
+"""
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that uses PostgreSQL planner statistics instead of COUNT(*)
+    for unfiltered changelists on large tables.
+    Falls back to an exact count for filtered querysets, small tables,
+    and non-PostgreSQL databases.
+    """
+    # Below this many rows an exact COUNT(*) is cheap and always accurate
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        estimate = self._estimated_count()
+        if estimate is None or estimate < self.exact_count_threshold:
+            return super().count
+        return estimate
+
+    def _estimated_count(self):
+        """Return the planner's row estimate, or None if it cannot be used"""
+        query = getattr(self.object_list, 'query', None)
+        if query is None or query.where:
+            return None
+
+        connection = connections[self.object_list.db]
+        if connection.vendor != 'postgresql':
+            return None
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                [self.object_list.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+
+        # reltuples is -1 (or 0) until the table has been analyzed
+        if not row or row[0] <= 0:
+            return None
+        return int(row[0])
@@ -1,9 +1,50 @@
 """
 Tests for The Logbook Onboarding Module
 """
-from django.test import TestCase, Client
+import io
+import json
+import socketserver
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import LiveServerTestCase, RequestFactory, TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from .models import OnboardingConfig
+from .models import OnboardingConfig, OnboardingStep
+from .paginators import EstimatedCountPaginator
+from .views import OnboardingStepView, WelcomeView
+from PIL import Image
+from . import images, verification
+
+try:
+    from moto import mock_aws
+except ImportError:
+    mock_aws = None
+
+
+class DebugSMTPHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP server that accepts EHLO and QUIT, for local checks"""
+
+    def handle(self):
+        self.wfile.write(b"220 localhost ESMTP test\r\n")
+        for line in self.rfile:
+            command = line.strip().upper()
+            if command.startswith(b"EHLO") or command.startswith(b"HELO"):
+                self.wfile.write(b"250 localhost\r\n")
+            elif command == b"QUIT":
+                self.wfile.write(b"221 Bye\r\n")
+                return
+            else:
+                self.wfile.write(b"502 Not implemented\r\n")
 
 
 class OnboardingWelcomeViewTest(TestCase):
@@ -29,6 +70,51 @@ class OnboardingWelcomeViewTest(TestCase):
         self.assertContains(response, 'Welcome Back')
 
 
+class WelcomePageCachingTest(TestCase):
+    """Test cases for welcome page validators and rendered-page caching"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.config = OnboardingConfig.objects.create(organization_name="Test Fire Department")
+
+    def test_conditional_get_returns_not_modified(self):
+        """Test that a matching ETag gets a 304"""
+        response = self.client.get(reverse('onboarding:welcome'))
+        self.assertIn('Last-Modified', response)
+
+        response = self.client.get(reverse('onboarding:welcome'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_config_change_changes_etag(self):
+        """Test that saving the config invalidates validators and the cache"""
+        etag = self.client.get(reverse('onboarding:welcome'))['ETag']
+
+        self.config.is_completed = True
+        self.config.save()
+
+        response = self.client.get(reverse('onboarding:welcome'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Welcome Back')
+
+    def test_anonymous_render_is_cached(self):
+        """Test that a repeat anonymous visit only checks the config version and reads the cache"""
+        self.client.get(reverse('onboarding:welcome'))
+        with self.assertNumQueries(2), mock.patch.object(WelcomeView, 'get_context_data') as get_context_data:
+            response = self.client.get(reverse('onboarding:welcome'))
+        get_context_data.assert_not_called()
+        self.assertContains(response, 'Continue Setup')
+
+    def test_flash_messages_bypass_cache(self):
+        """Test that pages with pending messages are rendered fresh"""
+        OnboardingConfig.objects.all().delete()
+        self.client.get(reverse('onboarding:welcome'))
+        response = self.client.post(reverse('onboarding:step', kwargs={'step': 2}), follow=True)
+        self.assertContains(response, 'Onboarding session not found')
+        self.assertNotIn('ETag', response)
+
+
 class OnboardingConfigModelTest(TestCase):
     """Test cases for the OnboardingConfig model"""
 
@@ -103,3 +189,386 @@ class OnboardingStepViewTest(TestCase):
         """Test that invalid step numbers redirect to step 1"""
         response = self.client.get(reverse('onboarding:step', kwargs={'step': 99}))
         self.assertEqual(response.status_code, 302)
+
+
+class OnboardingAdminTest(TestCase):
+    """Test cases for the onboarding admin changelists"""
+
+    def setUp(self):
+        self.client = Client()
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'admin-password')
+        self.client.force_login(admin_user)
+
+    def _create_steps(self, count):
+        for i in range(count):
+            config = OnboardingConfig.objects.create(organization_name=f"Department {i}")
+            OnboardingStep.objects.create(config=config, step_number=1, step_name='Organization Setup')
+
+    def test_changelists_defer_undisplayed_columns(self):
+        """Test that changelist rows load only the list_only columns"""
+        self._create_steps(2)
+        response = self.client.get(reverse('admin:onboarding_app_onboardingstep_changelist'))
+        step = response.context['cl'].result_list[0]
+        self.assertIn('data', step.get_deferred_fields())
+        self.assertIn('email_host', step.config.get_deferred_fields())
+        self.assertNotIn('organization_name', step.config.get_deferred_fields())
+
+        response = self.client.get(reverse('admin:onboarding_app_onboardingconfig_changelist'))
+        config = response.context['cl'].result_list[0]
+        self.assertIn('email_host_password_encrypted', config.get_deferred_fields())
+
+    def test_estimated_paginator_uses_planner_estimate(self):
+        """Test that large unfiltered tables use pg_class.reltuples"""
+        self._create_steps(3)
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value.fetchone.return_value = (250000.0,)
+        fake_connection = mock.Mock(vendor='postgresql')
+        fake_connection.cursor.return_value = cursor
+        with mock.patch('onboarding_app.paginators.connections', {'default': fake_connection}):
+            self.assertEqual(EstimatedCountPaginator(OnboardingConfig.objects.all(), 25).count, 250000)
+            # Filtered querysets always get an exact count
+            filtered = OnboardingConfig.objects.filter(organization_name='Department 1')
+            self.assertEqual(EstimatedCountPaginator(filtered, 25).count, 1)
+
+    def test_config_changelist_search(self):
+        """Test searching configs by organization name"""
+        self._create_steps(3)
+        response = self.client.get(
+            reverse('admin:onboarding_app_onboardingconfig_changelist'), {'q': 'department 1'}
+        )
+        self.assertContains(response, 'Department 1')
+        self.assertNotContains(response, 'Department 2')
+
+    def test_step_changelist_searches_indexed_columns_only(self):
+        """Test that step search only uses the trigram-indexed organization name"""
+        step_admin = admin.site._registry[OnboardingStep]
+        self.assertEqual(step_admin.search_fields, ['config__organization_name'])
+
+        self._create_steps(3)
+        response = self.client.get(
+            reverse('admin:onboarding_app_onboardingstep_changelist'), {'q': 'department 2'}
+        )
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_estimated_paginator_counts_small_tables_exactly(self):
+        """Test that small tables fall back to an exact count"""
+        self._create_steps(3)
+        paginator = EstimatedCountPaginator(OnboardingConfig.objects.all(), 25)
+        self.assertEqual(paginator.count, 3)
+
+
+# The local test servers listen on loopback, which checks refuse by default
+@override_settings(ONBOARDING_VERIFY_TIMEOUT=2, ONBOARDING_VERIFY_MAX_WORKERS=4,
+                   ONBOARDING_VERIFY_ALLOW_PRIVATE_HOSTS=True)
+class OnboardingVerificationTest(TestCase):
+    """Test cases for step 8 connectivity verification"""
+
+    def setUp(self):
+        cache.clear()
+        self.smtp_server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), DebugSMTPHandler)
+        self.smtp_server.daemon_threads = True
+        threading.Thread(target=self.smtp_server.serve_forever, daemon=True).start()
+        self.addCleanup(self.smtp_server.server_close)
+        self.addCleanup(self.smtp_server.shutdown)
+
+    def _config(self, **kwargs):
+        defaults = {
+            'organization_name': 'Test Dept',
+            'email_host': '127.0.0.1',
+            'email_port': self.smtp_server.server_address[1],
+            'email_use_tls': False,
+        }
+        defaults.update(kwargs)
+        return OnboardingConfig.objects.create(**defaults)
+
+    def test_smtp_check_against_local_server(self):
+        """Test that a reachable SMTP host passes"""
+        status, detail = verification.check_smtp(self._config(), timeout=2)
+        self.assertEqual(status, 'ok')
+
+    def test_smtp_check_reports_failure(self):
+        """Test that an unreachable SMTP host is reported as failed"""
+        self.smtp_server.server_close()
+        results = list(verification.iter_verification_results(self._config()))
+        smtp = next(result for result in results if result['name'] == 'smtp')
+        self.assertEqual(smtp['status'], 'failed')
+        # Raw socket errors are not echoed back to the caller
+        self.assertEqual(smtp['detail'], 'Connection failed')
+
+    def test_integration_check_rejects_non_http_urls(self):
+        """Test that file: and other schemes are never fetched"""
+        with mock.patch('urllib.request.urlopen') as urlopen:
+            status, detail = verification.check_integration('file:///etc/passwd', timeout=2)
+        self.assertEqual(status, 'failed')
+        urlopen.assert_not_called()
+
+    @override_settings(ONBOARDING_VERIFY_ALLOW_PRIVATE_HOSTS=False)
+    def test_checks_refuse_private_addresses(self):
+        """Test that checks never connect to loopback or private hosts"""
+        config = self._config()
+        with mock.patch('socket.create_connection') as create_connection:
+            self.assertRaises(verification.BlockedAddressError, verification.check_smtp, config, 2)
+            self.assertRaises(verification.BlockedAddressError, verification.check_integration,
+                              'http://10.0.0.1:8080/health', 2)
+            create_connection.assert_not_called()
+
+        results = list(verification.iter_verification_results(config))
+        smtp = next(result for result in results if result['name'] == 'smtp')
+        self.assertEqual(smtp['detail'], 'Private and local addresses are not allowed')
+
+    def test_checks_run_concurrently(self):
+        """Test that slow checks overlap instead of running back to back"""
+        config = self._config()
+
+        def slow_check(timeout):
+            time.sleep(0.5)
+            return 'ok', 'slow'
+
+        checks = [(f'slow{i}', f'Slow {i}', slow_check) for i in range(4)]
+        with mock.patch.object(verification, 'get_checks', return_value=checks):
+            started = time.monotonic()
+            results = list(verification.iter_verification_results(config))
+        self.assertEqual(len(results), 4)
+        self.assertLess(time.monotonic() - started, 1.5)
+
+    def test_results_cached_per_config_version(self):
+        """Test that results are reused until the config is saved again"""
+        config = self._config()
+        first = list(verification.iter_verification_results(config))
+        with mock.patch.object(verification, 'get_checks') as get_checks:
+            self.assertEqual(list(verification.iter_verification_results(config)), first)
+            get_checks.assert_not_called()
+
+            config.email_port = 1
+            config.save()
+            get_checks.return_value = []
+            list(verification.iter_verification_results(config))
+            get_checks.assert_called_once()
+
+    def test_refresh_is_throttled(self):
+        """Test that repeated refreshes within the window reuse cached results"""
+        config = self._config()
+        list(verification.iter_verification_results(config, refresh=True))
+        with mock.patch.object(verification, 'get_checks') as get_checks:
+            list(verification.iter_verification_results(config, refresh=True))
+            get_checks.assert_not_called()
+
+    def test_concurrent_run_waits_for_results(self):
+        """Test that a second caller waits for the run already in progress"""
+        config = self._config()
+        key = verification._cache_key(config)
+        cache.add(f"{key}:running", True, 30)
+
+        def finish_other_run(seconds):
+            cache.set(key, [{'name': 'smtp', 'status': 'ok'}], 60)
+
+        with mock.patch.object(verification, '_run_check') as run_check, \
+                mock.patch.object(verification.time, 'sleep', side_effect=finish_other_run):
+            results = list(verification.iter_verification_results(config))
+            run_check.assert_not_called()
+        self.assertEqual(results, [{'name': 'smtp', 'status': 'ok'}])
+
+    @unittest.skipIf(mock_aws is None, "moto is not installed")
+    def test_s3_check_with_moto(self):
+        """Test the S3 check against a mocked bucket"""
+        import boto3
+        with mock_aws():
+            boto3.client('s3', region_name='us-east-1').create_bucket(Bucket='logbook-files')
+            config = self._config(storage_backend='s3', s3_bucket_name='logbook-files')
+            config.set_s3_access_key('testing')
+            config.set_s3_secret_key('testing')
+            self.assertEqual(verification.check_s3(config, timeout=2)[0], 'ok')
+
+            config.s3_bucket_name = 'missing-bucket'
+            self.assertRaises(Exception, verification.check_s3, config, 2)
+
+    def _owner_client(self, config):
+        """A client whose session entered the config's settings"""
+        client = Client()
+        session = client.session
+        session['onboarding_config_id'] = config.pk
+        session.save()
+        return client
+
+    def test_verify_view_streams_results(self):
+        """Test that the verify endpoint streams one JSON result per line"""
+        client = self._owner_client(self._config())
+        response = client.post(reverse('onboarding:verify'))
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        results = {json.loads(line)['name']: json.loads(line) for line in lines}
+        self.assertEqual(results['smtp']['status'], 'ok')
+        self.assertEqual(results['s3']['status'], 'skipped')
+
+
+    def test_verify_view_limited_to_owner_and_staff(self):
+        """Test that only the wizard's session or staff can trigger checks, and only by POST"""
+        config = self._config()
+        verify_url = reverse('onboarding:verify')
+        self.assertEqual(self._owner_client(config).get(verify_url).status_code, 405)
+        self.assertEqual(Client().post(verify_url).status_code, 403)
+
+        staff = Client()
+        staff.force_login(User.objects.create_user('staff', password='staff-password', is_staff=True))
+        self.assertEqual(staff.post(verify_url).status_code, 200)
+
+        csrf_client = Client(enforce_csrf_checks=True)
+        csrf_client.force_login(User.objects.get(username='staff'))
+        self.assertEqual(csrf_client.post(verify_url).status_code, 403)
+
+    def test_wizard_post_grants_verification(self):
+        """Test that saving a step lets that session run the checks"""
+        self._config()
+        client = Client()
+        client.post(reverse('onboarding:step', kwargs={'step': 3}), {'session_timeout': '60'})
+        self.assertEqual(client.post(reverse('onboarding:verify')).status_code, 200)
+
+
+class OnboardingLogoTest(TestCase):
+    """Test cases for logo upload and variant generation"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media_root.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+    def _png(self, size=(1024, 256)):
+        output = io.BytesIO()
+        Image.new('RGBA', size, (220, 38, 38, 255)).save(output, format='PNG')
+        return output.getvalue()
+
+    def test_render_logo_variants(self):
+        """Test that every variant is rendered within its bounding box"""
+        # Run through the process pool to check the job crosses processes
+        rendered = images._get_process_pool().submit(images.render_logo_variants, self._png()).result()
+        for name in ('favicon', 'favicon_ico', 'header', 'header_2x', 'header_webp', 'header_avif'):
+            self.assertIn(name, rendered)
+        with Image.open(io.BytesIO(rendered['header_avif'][0])) as header_avif:
+            self.assertEqual(header_avif.format, 'AVIF')
+
+        with Image.open(io.BytesIO(rendered['favicon'][0])) as favicon:
+            self.assertEqual(favicon.size, (32, 32))
+        with Image.open(io.BytesIO(rendered['header_2x'][0])) as header:
+            self.assertEqual(header.size, (512, 128))
+
+    def test_store_logo_variants_uses_content_hashed_names(self):
+        """Test that stored variants are named by content and reused"""
+        config = OnboardingConfig.objects.create(organization_name="Test Dept")
+        rendered = images.render_logo_variants(self._png())
+
+        first = images.store_logo_variants(config.pk, rendered)
+        second = images.store_logo_variants(config.pk, rendered)
+        self.assertEqual(first, second)
+        self.assertRegex(first['header'], r'^logos/header\.[0-9a-f]{16}\.png$')
+
+        config.refresh_from_db()
+        self.assertEqual(config.logo_variants, first)
+        self.assertTrue(config.get_logo_urls()['favicon'].startswith('/media/logos/'))
+
+    def test_step1_logo_upload_is_processed_in_background(self):
+        """Test that a valid upload is handed off instead of resized inline"""
+        client = Client()
+        client.get(reverse('onboarding:step', kwargs={'step': 1}))
+        logo = SimpleUploadedFile('logo.png', self._png(), content_type='image/png')
+        with mock.patch('onboarding_app.views.schedule_logo_variants') as schedule:
+            response = client.post(reverse('onboarding:step', kwargs={'step': 1}), {
+                'organization_name': 'Test Fire Department',
+                'logo': logo,
+            })
+        self.assertEqual(response.status_code, 302)
+        schedule.assert_called_once()
+
+    def test_step1_rejects_non_image_logo(self):
+        """Test that a non-image upload is rejected with a message"""
+        client = Client()
+        client.get(reverse('onboarding:step', kwargs={'step': 1}))
+        logo = SimpleUploadedFile('logo.png', b'not an image', content_type='image/png')
+        with mock.patch('onboarding_app.views.schedule_logo_variants') as schedule:
+            response = client.post(reverse('onboarding:step', kwargs={'step': 1}), {
+                'organization_name': 'Test Fire Department',
+                'logo': logo,
+            }, follow=True)
+        schedule.assert_not_called()
+        # The user is sent back to step 1 to fix the logo
+        self.assertEqual(response.redirect_chain[-1][0], reverse('onboarding:step', kwargs={'step': 1}))
+        self.assertContains(response, 'Logo must be a PNG, JPEG, WebP or GIF image.')
+
+    @override_settings(LOGO_MAX_PIXELS=100_000)
+    def test_step1_rejects_oversized_dimensions(self):
+        """Test that images over the pixel limit are rejected before decoding"""
+        with self.assertRaisesMessage(ValueError, 'at most 0.1 megapixels; this one is 1024 x 256'):
+            images.validate_logo(self._png())
+
+    def test_wizard_saves_keep_background_logo_variants(self):
+        """Test that a config loaded before variants were stored doesn't erase them"""
+        config = OnboardingConfig.objects.create(organization_name="Test Dept")
+        # Loaded by a wizard request before the background job finished
+        stale = OnboardingConfig.objects.get(pk=config.pk)
+        variants = images.store_logo_variants(config.pk, images.render_logo_variants(self._png()))
+
+        view = OnboardingStepView()
+        view._process_step1(RequestFactory().post('/', {'organization_name': 'Test Fire Department'}), stale)
+        view._process_step3(RequestFactory().post('/', {'session_timeout': '30'}), stale)
+
+        config.refresh_from_db()
+        self.assertEqual(config.logo_variants, variants)
+        self.assertEqual(config.organization_name, 'Test Fire Department')
+
+    def test_broken_process_pool_is_replaced(self):
+        """Test that a crashed worker pool is discarded for the next upload"""
+        broken_pool = mock.Mock()
+        broken_pool.submit.side_effect = images.BrokenProcessPool
+        with mock.patch.object(images, '_process_pool', broken_pool):
+            with self.assertRaises(images.BrokenProcessPool):
+                images._render_in_pool(self._png())
+            self.assertIsNone(images._process_pool)
+        broken_pool.shutdown.assert_called_once()
+
+
+class QueryMetricsMiddlewareTest(TestCase):
+    """Test cases for per-request database metrics headers"""
+
+    def test_headers_absent_by_default(self):
+        """Test that metrics are off unless enabled"""
+        response = Client().get(reverse('onboarding:welcome'))
+        self.assertNotIn('X-DB-Queries', response)
+
+    @override_settings(QUERY_METRICS_HEADERS=True)
+    def test_headers_report_query_count(self):
+        """Test that the query count header matches the queries run"""
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get(reverse('onboarding:welcome'))
+        self.assertEqual(int(response['X-DB-Queries']), len(queries))
+
+
+@override_settings(QUERY_METRICS_HEADERS=True)
+class LoadTestCommandTest(LiveServerTestCase):
+    """Test cases for the loadtest management command"""
+
+    def test_walks_wizard_and_reports(self):
+        """Test that a client completes the wizard and metrics are collected"""
+        out = io.StringIO()
+        call_command('loadtest', base_url=self.live_server_url, clients=1, json=True, stdout=out)
+        report = json.loads(out.getvalue())
+
+        self.assertEqual(report['wizards_completed'], 1)
+        self.assertEqual(report['overall']['errors'], 0)
+        # Welcome page, a GET and POST for each of the 8 steps, then the completed page
+        self.assertEqual(report['overall']['requests'], 18)
+        self.assertIsNotNone(report['overall']['queries_per_request'])
+        self.assertEqual(OnboardingConfig.objects.get(is_completed=True).organization_name,
+                         'Load Test Fire Department')
+
+    def test_concurrent_clients_report_matches_database(self):
+        """Test that clients losing the shared wizard are reported as errors"""
+        out = io.StringIO()
+        call_command('loadtest', base_url=self.live_server_url, clients=4, iterations=2, json=True, stdout=out)
+        report = json.loads(out.getvalue())
+
+        completed = OnboardingConfig.objects.filter(is_completed=True).count()
+        self.assertEqual(report['wizards_completed'], completed)
+        failed_walks = report['wizards_attempted'] - report['wizards_completed']
+        # Each failed walk stops at its first failed request
+        self.assertEqual(report['overall']['errors'], failed_walks)
@@ -9,4 +9,5 @@ app_name = 'onboarding'
 urlpatterns = [
     path('', views.WelcomeView.as_view(), name='welcome'),
     path('step/<int:step>/', views.OnboardingStepView.as_view(), name='step'),
+    path('step/8/verify/', views.VerificationView.as_view(), name='verify'),
 ]
@@ -0,0 +1,294 @@
+"""
+Connectivity verification for The Logbook Onboarding Module
+
+Checks the SMTP server, S3 bucket and integrations configured during
+onboarding. Checks run concurrently in a bounded thread pool so the
+review page waits for the slowest check rather than the sum of all of them.
+"""
+import http.client
+import ipaddress
+import logging
+import smtplib
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+_pool_lock = threading.Lock()
+_check_pool = None
+
+
+def _get_check_pool():
+    """
+    Shared pool for all checks in this process. A check stuck past its
+    timeout keeps its thread, but the pool size caps how many can pile up.
+    """
+    global _check_pool
+    with _pool_lock:
+        if _check_pool is None:
+            _check_pool = ThreadPoolExecutor(
+                max_workers=settings.ONBOARDING_VERIFY_MAX_WORKERS,
+                thread_name_prefix='onboarding-verify',
+            )
+    return _check_pool
+
+
+class BlockedAddressError(Exception):
+    """Raised when a check would connect to a private or loopback address"""
+
+
+def _resolve_public_address(host, port):
+    """
+    Resolve host and return the address to connect to. Every address it
+    resolves to must be public unless ONBOARDING_VERIFY_ALLOW_PRIVATE_HOSTS
+    is set, so the wizard can't be used to probe the internal network.
+    Callers connect to the returned address, so the host can't be
+    re-resolved to somewhere else between the check and the connect.
+    """
+    addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    if not settings.ONBOARDING_VERIFY_ALLOW_PRIVATE_HOSTS:
+        for *_, sockaddr in addresses:
+            if not ipaddress.ip_address(sockaddr[0]).is_global:
+                raise BlockedAddressError(f"{host} resolves to non-public address {sockaddr[0]}")
+    return addresses[0][4][0]
+
+
+def _create_public_connection(address, timeout, source_address=None):
+    """Drop-in for socket.create_connection used by http.client"""
+    host, port = address
+    return socket.create_connection((_resolve_public_address(host, port), port), timeout, source_address)
+
+
+class _PublicSMTPMixin:
+    """Connects only to public addresses; TLS still verifies the original host name"""
+    def _get_socket(self, host, port, timeout):
+        return super()._get_socket(_resolve_public_address(host, port), port, timeout)
+
+
+class _PublicSMTP(_PublicSMTPMixin, smtplib.SMTP):
+    pass
+
+
+class _PublicSMTP_SSL(_PublicSMTPMixin, smtplib.SMTP_SSL):
+    pass
+
+
+class _PublicHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _create_public_connection
+
+
+class _PublicHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _create_public_connection
+
+
+class _PublicHTTPHandler(urllib.request.HTTPHandler):
+    def do_open(self, http_class, req, **kwargs):
+        return super().do_open(_PublicHTTPConnection, req, **kwargs)
+
+
+class _PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def do_open(self, http_class, req, **kwargs):
+        return super().do_open(_PublicHTTPSConnection, req, **kwargs)
+
+
+class _NoRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """A redirect could point at an internal host, so it is never followed"""
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def _cache_key(config):
+    """Cache key tied to the config version, so any saved change re-runs checks"""
+    return f"onboarding:verify:{config.pk}:{config.updated_at.timestamp()}"
+
+
+def check_smtp(config, timeout):
+    """Connect to the SMTP host from step 2, negotiate TLS and log in"""
+    if not config.email_host:
+        return 'skipped', 'No SMTP host configured'
+
+    smtp_class = _PublicSMTP_SSL if config.email_use_ssl else _PublicSMTP
+    with smtp_class(config.email_host, config.email_port, timeout=timeout) as server:
+        server.ehlo()
+        if config.email_use_tls and not config.email_use_ssl:
+            server.starttls()
+            server.ehlo()
+        if config.email_host_user:
+            server.login(config.email_host_user, config.get_email_password())
+    return 'ok', f"Connected to {config.email_host}:{config.email_port}"
+
+
+def check_s3(config, timeout):
+    """Confirm the bucket from step 4 exists and the credentials can reach it"""
+    if config.storage_backend != 's3':
+        return 'skipped', 'Local storage selected'
+    if not config.s3_bucket_name:
+        return 'failed', 'No bucket name configured'
+
+    import boto3
+    from botocore.config import Config
+
+    client = boto3.client(
+        's3',
+        region_name=config.s3_region or None,
+        aws_access_key_id=config.get_s3_access_key() or None,
+        aws_secret_access_key=config.get_s3_secret_key() or None,
+        config=Config(connect_timeout=timeout, read_timeout=timeout, retries={'max_attempts': 1}),
+    )
+    client.head_bucket(Bucket=config.s3_bucket_name)
+    return 'ok', f"Bucket {config.s3_bucket_name} is reachable"
+
+
+def check_integration(url, timeout):
+    """Send a HEAD request to an integration endpoint"""
+    # urlopen also handles file: and ftp: URLs, which must never be fetched
+    if urllib.parse.urlsplit(url).scheme not in ('http', 'https'):
+        return 'failed', 'Integration URL must use http or https'
+    # No proxies either: the proxy host would be connected to unchecked
+    opener = urllib.request.build_opener(
+        urllib.request.ProxyHandler({}), _PublicHTTPHandler, _PublicHTTPSHandler, _NoRedirectHandler,
+    )
+    request = urllib.request.Request(url, method='HEAD')
+    try:
+        with opener.open(request, timeout=timeout) as response:
+            return 'ok', f"HTTP {response.status}"
+    except urllib.error.HTTPError as e:
+        if 300 <= e.code < 400:
+            return 'ok', f"HTTP {e.code}"
+        raise
+
+
+def get_checks(config):
+    """
+    Return (name, label, callable) tuples for every check that applies.
+    Integrations are checked when their entry in integrations_configured
+    has a 'url'.
+    """
+    checks = [
+        ('smtp', 'Email (SMTP)', lambda timeout: check_smtp(config, timeout)),
+        ('s3', 'File Storage (S3)', lambda timeout: check_s3(config, timeout)),
+    ]
+    for name, options in sorted((config.integrations_configured or {}).items()):
+        if isinstance(options, dict) and options.get('url'):
+            checks.append((
+                f"integration:{name}",
+                options.get('label', name),
+                lambda timeout, url=options['url']: check_integration(url, timeout),
+            ))
+    return checks
+
+
+def _failure_reason(exc):
+    """
+    Short, generic reason for a failed check. Raw exception text can reveal
+    details about hosts and ports, so it is only logged.
+    """
+    from botocore.exceptions import ClientError
+
+    if isinstance(exc, BlockedAddressError):
+        return 'Private and local addresses are not allowed'
+    if isinstance(exc, (socket.timeout, TimeoutError)):
+        return 'Timed out'
+    if isinstance(exc, smtplib.SMTPAuthenticationError):
+        return 'Authentication failed'
+    if isinstance(exc, ClientError):
+        code = exc.response.get('Error', {}).get('Code')
+        if code in ('403', 'AccessDenied'):
+            return 'Access denied'
+        if code in ('404', 'NoSuchBucket'):
+            return 'Bucket not found'
+    if isinstance(exc, (OSError, smtplib.SMTPException)):
+        return 'Connection failed'
+    return 'Check failed'
+
+
+def _run_check(name, label, func, timeout):
+    try:
+        status, detail = func(timeout)
+    except Exception as exc:
+        logger.info("Onboarding check %s failed: %r", name, exc)
+        status, detail = 'failed', _failure_reason(exc)
+    return {'name': name, 'label': label, 'status': status, 'detail': detail}
+
+
+def _wait_for_results(key, deadline):
+    """Wait for another request's run of the same config version to finish"""
+    while time.monotonic() < deadline:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        time.sleep(0.25)
+    return [{'name': 'pending', 'label': 'Connectivity checks', 'status': 'failed',
+             'detail': 'Checks are still running; try again shortly'}]
+
+
+def iter_verification_results(config, refresh=False):
+    """
+    Yield one result dict per check as soon as it finishes.
+    Results are cached for the current config version once every check
+    has reported; cached results are replayed unless refresh is set.
+    Refreshes are throttled and only one run per config version happens
+    at a time; concurrent callers wait for its results. The locks live in
+    the cache, so they hold across workers only with a shared backend
+    (see CACHES).
+    """
+    key = _cache_key(config)
+    if refresh and not cache.add(f"{key}:refreshed", True, settings.ONBOARDING_VERIFY_REFRESH_SECONDS):
+        refresh = False
+
+    cached = None if refresh else cache.get(key)
+    if cached is not None:
+        yield from cached
+        return
+
+    timeout = settings.ONBOARDING_VERIFY_TIMEOUT
+    checks = get_checks(config)
+    # Each check enforces its own timeout; this guards against a client
+    # library that ignores it, allowing for checks queued behind the pool.
+    waves = -(-len(checks) // settings.ONBOARDING_VERIFY_MAX_WORKERS)
+    overall_timeout = (timeout + 1) * max(waves, 1)
+
+    running_key = f"{key}:running"
+    if not cache.add(running_key, True, overall_timeout):
+        yield from _wait_for_results(key, time.monotonic() + overall_timeout)
+        return
+
+    results = []
+    futures = {}
+    try:
+        pool = _get_check_pool()
+        futures = {
+            pool.submit(_run_check, name, label, func, timeout): (name, label)
+            for name, label, func in checks
+        }
+        try:
+            for future in as_completed(futures, timeout=overall_timeout):
+                result = future.result()
+                results.append(result)
+                yield result
+        except FuturesTimeoutError:
+            reported = {result['name'] for result in results}
+            for name, label in futures.values():
+                if name not in reported:
+                    result = {'name': name, 'label': label, 'status': 'failed', 'detail': 'Timed out'}
+                    results.append(result)
+                    yield result
+        cache.set(key, results, settings.ONBOARDING_VERIFY_CACHE_SECONDS)
+    finally:
+        # Drop checks still queued if the client went away or we timed out
+        for future in futures:
+            future.cancel()
+        cache.delete(running_key)
@@ -1,38 +1,115 @@
 """
 Views for The Logbook Onboarding Module
 """
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db.models import Count, Max
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import get_template
 from django.views import View
 from django.contrib import messages
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from .models import OnboardingConfig, OnboardingStep
+from .images import check_logo_size, schedule_logo_variants, validate_logo
+from .verification import iter_verification_results
+
+
+# Session key naming the config whose settings this session entered
+VERIFY_SESSION_KEY = 'onboarding_config_id'
 
 
 class WelcomeView(View):
     """
     Landing page with fade-in animation.
     Displays welcome message and starts the onboarding process.
+
+    The page only changes when an onboarding config does, so responses carry
+    ETag/Last-Modified validators and anonymous renders are cached per
+    config version.
     """
+    template_name = 'onboarding/welcome.html'
+
     def get(self, request):
+        # Flash messages are shown once, so those renders are never reused
+        if len(messages.get_messages(request)):
+            return render(request, self.template_name, self.get_context_data())
+
+        etag, last_modified = self.get_validators()
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            if request.user.is_authenticated:
+                response = render(request, self.template_name, self.get_context_data())
+            else:
+                response = self._get_cached_response(request, etag)
+
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        # Browsers must revalidate, which is what turns repeat visits into 304s
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def get_validators(self):
+        """
+        Return (ETag, Last-Modified timestamp) for the current config version.
+        Any config save bumps updated_at and adding or deleting one changes the
+        count, which covers completion state, name, step, theme and logo.
+        """
+        version = OnboardingConfig.objects.aggregate(last_updated=Max('updated_at'), count=Count('id'))
+        last_updated = version['last_updated']
+        fingerprint = ':'.join(str(part) for part in (
+            version['count'],
+            last_updated.isoformat() if last_updated else '',
+            settings.APP_NAME,
+            settings.PRIMARY_COLOR,
+            settings.SECONDARY_COLOR,
+            _welcome_template_version(),
+        ))
+        etag = quote_etag(hashlib.md5(fingerprint.encode(), usedforsecurity=False).hexdigest())
+        return etag, int(last_updated.timestamp()) if last_updated else None
+
+    def get_context_data(self):
         # Check if onboarding is already completed
         completed_config = OnboardingConfig.objects.filter(is_completed=True).first()
         if completed_config:
             # Onboarding already done, could redirect to main app
-            context = {
+            return {
                 'onboarding_completed': True,
                 'organization_name': completed_config.organization_name,
             }
-            return render(request, 'onboarding/welcome.html', context)
 
         # Check if there's an in-progress onboarding
         in_progress = OnboardingConfig.objects.filter(is_completed=False).first()
 
-        context = {
+        return {
             'onboarding_completed': False,
             'has_in_progress': in_progress is not None,
             'current_step': in_progress.current_step if in_progress else 1,
         }
-        return render(request, 'onboarding/welcome.html', context)
+
+    def _get_cached_response(self, request, etag):
+        cache_key = 'onboarding:welcome:' + etag.strip('"')
+        content = cache.get(cache_key)
+        if content is None:
+            content = render(request, self.template_name, self.get_context_data()).content
+            cache.set(cache_key, content, settings.WELCOME_PAGE_CACHE_SECONDS)
+        return HttpResponse(content)
+
+
+@lru_cache(maxsize=None)
+def _welcome_template_version():
+    """Latest modification time of the welcome page templates, so deploys change the ETag"""
+    names = ['onboarding/welcome.html', 'onboarding/logo_picture.html', 'base.html']
+    return max(os.path.getmtime(get_template(name).origin.name) for name in names)
 
 
 class OnboardingStepView(View):
@@ -75,7 +152,8 @@ class OnboardingStepView(View):
         # Update current step if moving forward
         if step > config.current_step:
             config.current_step = step
-            config.save()
+            # update_fields keeps logo_variants written by the background job
+            config.save(update_fields=['current_step', 'updated_at'])
 
         context = {
             'step': step,
@@ -95,9 +173,14 @@ class OnboardingStepView(View):
             messages.error(request, "Onboarding session not found. Please start again.")
             return redirect('onboarding:welcome')
 
+        # Only the session that entered these settings may run checks against them
+        request.session[VERIFY_SESSION_KEY] = config.pk
+
         # Process step-specific data
         if step == 1:
-            self._process_step1(request, config)
+            if not self._process_step1(request, config):
+                # Show the logo error where the logo can be fixed
+                return redirect('onboarding:step', step=1)
         elif step == 2:
             self._process_step2(request, config)
         elif step == 3:
@@ -105,11 +188,16 @@ class OnboardingStepView(View):
         elif step == 4:
             self._process_step4(request, config)
         elif step == 8:
-            # Final step - mark as completed
-            config.is_completed = True
-            config.completed_at = timezone.now()
-            config.save()
-            messages.success(request, "Onboarding completed successfully!")
+            # Final step - mark as completed. The is_completed filter makes this
+            # atomic, so concurrent submissions can't both complete the same config.
+            now = timezone.now()
+            completed = OnboardingConfig.objects.filter(pk=config.pk, is_completed=False).update(
+                is_completed=True, completed_at=now, updated_at=now
+            )
+            if completed:
+                messages.success(request, "Onboarding completed successfully!")
+            else:
+                messages.error(request, "Onboarding session not found. Please start again.")
             return redirect('onboarding:welcome')
 
         # Move to next step
@@ -120,11 +208,25 @@ class OnboardingStepView(View):
         return redirect('onboarding:welcome')
 
     def _process_step1(self, request, config):
-        """Process organization setup"""
+        """Process organization setup; returns False if the logo was rejected"""
         config.organization_name = request.POST.get('organization_name', '')
         config.primary_color = request.POST.get('primary_color', '#DC2626')
         config.secondary_color = request.POST.get('secondary_color', '#1F2937')
-        config.save()
+        config.save(update_fields=['organization_name', 'primary_color', 'secondary_color', 'updated_at'])
+
+        logo = request.FILES.get('logo')
+        if logo:
+            try:
+                # Check the declared size before reading the upload into memory
+                check_logo_size(logo.size)
+                data = logo.read()
+                validate_logo(data)
+            except ValueError as e:
+                messages.error(request, str(e))
+                return False
+            # Variants are rendered in a process pool; pages show them once stored
+            schedule_logo_variants(config.pk, data)
+        return True
 
     def _process_step2(self, request, config):
         """Process email configuration"""
@@ -139,7 +241,10 @@ class OnboardingStepView(View):
         if password:
             config.set_email_password(password)
 
-        config.save()
+        config.save(update_fields=[
+            'email_host', 'email_port', 'email_use_tls', 'email_host_user',
+            'email_from_address', 'email_host_password_encrypted', 'updated_at',
+        ])
 
     def _process_step3(self, request, config):
         """Process security settings"""
@@ -147,7 +252,9 @@ class OnboardingStepView(View):
         config.password_min_length = int(request.POST.get('password_min_length', 12))
         config.require_2fa = request.POST.get('require_2fa') == 'on'
         config.allowed_domains = request.POST.get('allowed_domains', '')
-        config.save()
+        config.save(update_fields=[
+            'session_timeout_minutes', 'password_min_length', 'require_2fa', 'allowed_domains', 'updated_at',
+        ])
 
     def _process_step4(self, request, config):
         """Process file storage configuration"""
@@ -165,4 +272,36 @@ class OnboardingStepView(View):
             if secret_key:
                 config.set_s3_secret_key(secret_key)
 
-        config.save()
+        config.save(update_fields=[
+            'storage_backend', 's3_bucket_name', 's3_region',
+            's3_access_key_encrypted', 's3_secret_key_encrypted', 'updated_at',
+        ])
+
+
+class VerificationView(View):
+    """
+    Streams connectivity check results for the review page.
+    Each check is written as one line of JSON as soon as it finishes.
+
+    Checks open connections to hosts the wizard user entered, so this is a
+    CSRF-protected POST limited to staff and the session that saved the
+    settings.
+    """
+    http_method_names = ['post']
+
+    def post(self, request):
+        config = OnboardingConfig.objects.filter(is_completed=False).first()
+        if not config:
+            return redirect('onboarding:welcome')
+        if not request.user.is_staff and request.session.get(VERIFY_SESSION_KEY) != config.pk:
+            raise PermissionDenied
+
+        results = iter_verification_results(config, refresh=request.POST.get('refresh') == '1')
+        response = StreamingHttpResponse(
+            (json.dumps(result) + '\n' for result in results),
+            content_type='application/x-ndjson',
+        )
+        response['Cache-Control'] = 'no-store'
+        # Stop nginx from buffering the stream until every check is done
+        response['X-Accel-Buffering'] = 'no'
+        return response
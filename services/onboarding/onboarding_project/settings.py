@@ -22,6 +22,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # Third-party apps
     'rest_framework',
@@ -33,6 +34,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so session and auth queries are counted too
+    'onboarding_app.middleware.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -73,9 +76,26 @@ DATABASES = {
         'PASSWORD': config('POSTGRES_PASSWORD', default='password'),
         'HOST': config('POSTGRES_HOST', default='db'),
         'PORT': config('POSTGRES_PORT', default='5432'),
+        # Seconds to keep connections open between requests (0 = per request)
+        'CONN_MAX_AGE': config('POSTGRES_CONN_MAX_AGE', default=0, cast=int),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Cache
+# Shared by every gunicorn worker, so the verification locks and throttle and the
+# cached pages apply per deployment, not per process. Create the table with
+# `python manage.py createcachetable` (the container does this on start).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'onboarding_cache',
+    }
+}
+
+# Report DB queries/connections per request in response headers (load testing)
+QUERY_METRICS_HEADERS = config('QUERY_METRICS_HEADERS', default=False, cast=bool)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -160,6 +180,23 @@ APP_NAME = config('APP_NAME', default='The Logbook')
 PRIMARY_COLOR = config('PRIMARY_COLOR', default='#DC2626')
 SECONDARY_COLOR = config('SECONDARY_COLOR', default='#1F2937')
 
+# Onboarding Verification (step 8 connectivity checks)
+ONBOARDING_VERIFY_TIMEOUT = config('ONBOARDING_VERIFY_TIMEOUT', default=10, cast=int)  # seconds per check
+ONBOARDING_VERIFY_MAX_WORKERS = config('ONBOARDING_VERIFY_MAX_WORKERS', default=4, cast=int)
+ONBOARDING_VERIFY_CACHE_SECONDS = config('ONBOARDING_VERIFY_CACHE_SECONDS', default=300, cast=int)
+ONBOARDING_VERIFY_REFRESH_SECONDS = config('ONBOARDING_VERIFY_REFRESH_SECONDS', default=30, cast=int)  # min gap between re-runs
+# Allow checks against private/loopback hosts, e.g. an SMTP relay on the local network
+ONBOARDING_VERIFY_ALLOW_PRIVATE_HOSTS = config('ONBOARDING_VERIFY_ALLOW_PRIVATE_HOSTS', default=False, cast=bool)
+
+# Welcome Page (rendered page cache, keyed by config version)
+WELCOME_PAGE_CACHE_SECONDS = config('WELCOME_PAGE_CACHE_SECONDS', default=600, cast=int)
+
+# Logo Uploads (variants are generated once in a process pool)
+LOGO_UPLOAD_DIR = 'logos'
+LOGO_MAX_UPLOAD_BYTES = config('LOGO_MAX_UPLOAD_BYTES', default=5 * 1024 * 1024, cast=int)
+LOGO_MAX_PIXELS = config('LOGO_MAX_PIXELS', default=4096 * 4096, cast=int)  # width x height
+LOGO_PROCESS_WORKERS = config('LOGO_PROCESS_WORKERS', default=2, cast=int)
+
 # Email Configuration
 EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
 EMAIL_HOST = config('EMAIL_HOST', default='')
@@ -169,9 +206,13 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 
 # Storage Configuration
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
 STORAGE_BACKEND = config('STORAGE_BACKEND', default='local')
 if STORAGE_BACKEND == 's3':
-    DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
+    STORAGES['default'] = {'BACKEND': 'storages.backends.s3boto3.S3Boto3Storage'}
     AWS_ACCESS_KEY_ID = config('AWS_ACCESS_KEY_ID', default='')
     AWS_SECRET_ACCESS_KEY = config('AWS_SECRET_ACCESS_KEY', default='')
     AWS_STORAGE_BUCKET_NAME = config('AWS_STORAGE_BUCKET_NAME', default='')